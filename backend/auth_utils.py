@@ -1,11 +1,15 @@
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from database import get_db
+from cache import user_cache
+import hashlib
 import os
+import time
 
 # Security configuration
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here-change-in-production")
@@ -31,24 +35,50 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def verify_token(token: str):
+def decode_token(token: str):
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            return None
-        return username
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     except JWTError:
         return None
 
+def verify_token(token: str):
+    payload = decode_token(token)
+    if payload is None:
+        return None
+    username: str = payload.get("sub")
+    if username is None:
+        return None
+    return username
+
 security = HTTPBearer()
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
+async def get_current_user(
+    request: Request,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_db)
+):
     """Get current user from JWT token"""
     from schemas import User
     
+    # Already resolved earlier in this request (middleware or another dependency)
+    user = getattr(request.state, "user", None)
+    if user is not None:
+        return user
+    
     token = credentials.credentials
-    username = verify_token(token)
+    cache_key = hashlib.sha256(token.encode()).digest()
+    cached = user_cache.get(cache_key)
+    # The entry can outlive the token: an expired one is a miss, and the
+    # decode below rejects it
+    if cached is not None and cached[1]["exp"] <= time.time():
+        user_cache.pop(cache_key, None)
+        cached = None
+    if cached is not None:
+        request.state.user, request.state.claims = cached
+        return cached[0]
+    
+    claims = decode_token(token)
+    username = claims.get("sub") if claims else None
     
     if username is None:
         raise HTTPException(
@@ -57,7 +87,7 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    user = db.query(User).filter(User.username == username).first()
+    user = (await db.execute(select(User).where(User.username == username))).scalar_one_or_none()
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -65,4 +95,25 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # Detach so the cached instance is never flushed through another session
+    db.expunge(user)
+    user_cache[cache_key] = (user, claims)
+    # Shared with anything else handling this request (nested dependencies, middleware)
+    request.state.user = user
+    request.state.claims = claims
     return user
+
+def require_role(*roles, detail: str = None):
+    """Dependency factory: resolve the current user and require one of the given roles"""
+    if detail is None:
+        detail = "Only " + " and ".join(f"{role}s" for role in roles) + " can access this endpoint"
+    
+    async def dependency(current_user = Depends(get_current_user)):
+        if current_user.role not in roles:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=detail
+            )
+        return current_user
+    
+    return dependency
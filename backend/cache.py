@@ -0,0 +1,56 @@
+from cachetools import TTLCache
+from models import AssignmentResponse
+from schemas import Assignment
+
+# Every cache here is per process: each worker keeps its own copy and the
+# invalidate_* helpers only reach the worker that made the write. Other
+# workers catch up when their entries expire, so each TTL is the bound on
+# cross-worker staleness.
+
+# (user, claims) keyed by a digest of the bearer token, so repeat requests
+# with the same token skip the JWT decode and the user lookup
+user_cache = TTLCache(maxsize=10_000, ttl=60)
+
+# Serialized teacher directory for messaging. Cleared whenever this process
+# writes a user row; the TTL bounds staleness from writes on other workers.
+teachers_cache = TTLCache(maxsize=1, ttl=60)
+
+# AssignmentResponse snapshots by id. Detached Pydantic copies rather than
+# ORM instances, so nothing cached is tied to the session that loaded it.
+# Only used to serve response data; ownership checks always read
+# created_by_id from the database. Same short TTL as the list responses.
+assignment_cache = TTLCache(maxsize=1024, ttl=30)
+
+# Serialized assignment/submission list bodies keyed by (endpoint, scope,
+# query params). Any assignment or submission write clears them all; the
+# short TTL bounds staleness from writes on other workers.
+response_cache = TTLCache(maxsize=4096, ttl=30)
+
+def invalidate_users():
+    """Drop cached data derived from the users table"""
+    # Cached logins need no eviction here: the only user writes are
+    # approvals creating brand-new users, who have no token yet
+    teachers_cache.clear()
+
+def invalidate_list_responses():
+    """Drop cached list bodies after an assignment or submission write"""
+    response_cache.clear()
+
+def invalidate_assignment(assignment_id: int):
+    """Drop cached data for an updated or deleted assignment"""
+    assignment_cache.pop(assignment_id, None)
+    invalidate_list_responses()
+
+async def get_assignment_cached(db, assignment_id: int):
+    """Assignment snapshot by id from the cache, falling back to the database"""
+    cached = assignment_cache.get(assignment_id)
+    if cached is not None:
+        return cached
+    
+    assignment = await db.get(Assignment, assignment_id)
+    if assignment is None:
+        return None
+    
+    snapshot = AssignmentResponse.model_validate(assignment)
+    assignment_cache[assignment_id] = snapshot
+    return snapshot
@@ -1,19 +1,21 @@
 from fastapi import FastAPI, HTTPException, Depends, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from database import engine, Base, SessionLocal
+from sqlalchemy import text
+from database import engine, Base, insert_ignore
+from response_utils import UTCJSONResponse
 from routers import auth, students, teachers, attendance, assignments, messages, registration_requests
 from schemas import User
-from auth_utils import get_password_hash
+import asyncio
+import fcntl
 import uvicorn
-
-# Create database tables
-Base.metadata.create_all(bind=engine)
+import os
 
 app = FastAPI(
     title="School Management System API",
     description="Backend API for School Management System",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=UTCJSONResponse
 )
 
 # Configure CORS
@@ -34,28 +36,48 @@ app.include_router(assignments.router, prefix="/api/assignments", tags=["assignm
 app.include_router(messages.router, prefix="/api/messages", tags=["messages"])
 app.include_router(registration_requests.router, prefix="/api/registration-requests", tags=["registration-requests"])
 
-# Seed default users on startup (admin, teacher1, parent1, student1)
+# Precomputed pwd_context hashes of the demo passwords (admin123, teacher123,
+# parent123, student123) so startup does no password hashing at all
+ADMIN_HASH = "$pbkdf2-sha256$29000$do5xrnXufS.l1FrrvXcuxQ$2vV3y/beW8lM9YnED29i5ls85e0H/LCKZvMX6sZb8cI"
+TEACHER_HASH = "$pbkdf2-sha256$29000$EgIAYOwdw9ib876Xcq7Vug$viu0wzKFnUom.oqMgT9mU.MZYX9LbdZkbwpiwSfyCR0"
+PARENT_HASH = "$pbkdf2-sha256$29000$uRfCGMMY45wz5jxnjDHm/A$KA6wKkECH/Z32VXtAFVOyUX4KjYUR4RoKJ2SZN4aNPI"
+STUDENT_HASH = "$pbkdf2-sha256$29000$OYfw3pvTei/FGMO4d27tXQ$oDcO1vqMHoQcDoYXdv8801pvuJ7a01TuvbRsksfaLW0"
+
+DEMO_USERS = [
+    {"username": username, "email": email, "password_hash": password_hash, "name": name, "role": role}
+    for username, email, password_hash, name, role in [
+        ("admin", "admin@school.com", ADMIN_HASH, "Administrator", "admin"),
+        ("teacher1", "teacher1@school.com", TEACHER_HASH, "Teacher One", "teacher"),
+        ("parent1", "parent1@school.com", PARENT_HASH, "Parent One", "parent"),
+        ("student1", "student1@school.com", STUDENT_HASH, "Student One", "student"),
+    ]
+]
+
+# Arbitrary application-wide key for pg_advisory_xact_lock
+INIT_DB_LOCK_KEY = 4242
+
+async def create_and_seed():
+    async with engine.begin() as conn:
+        if engine.dialect.name == "postgresql":
+            await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": INIT_DB_LOCK_KEY})
+        await conn.run_sync(Base.metadata.create_all)
+        # ON CONFLICT DO NOTHING keeps the seed itself idempotent
+        await conn.execute(insert_ignore(User).values(DEMO_USERS))
+
+# Create database tables, then seed default users (admin, teacher1, parent1, student1)
 @app.on_event("startup")
-def seed_default_users():
-    db = SessionLocal()
-    try:
-        def ensure_user(username, email, password, name, role):
-            if not db.query(User).filter(User.username == username).first():
-                db.add(User(
-                    username=username,
-                    email=email,
-                    password_hash=get_password_hash(password),
-                    name=name,
-                    role=role,
-                ))
-                db.commit()
-        ensure_user("admin", "admin@school.com", "admin123", "Administrator", "admin")
-        ensure_user("teacher1", "teacher1@school.com", "teacher123", "Teacher One", "teacher")
-        ensure_user("parent1", "parent1@school.com", "parent123", "Parent One", "parent")
-        ensure_user("student1", "student1@school.com", "student123", "Student One", "student")
-        print("Ensured demo users exist: admin, teacher1, parent1, student1")
-    finally:
-        db.close()
+async def init_db():
+    # Every worker runs this hook at once (uvicorn workers or gunicorn) and
+    # create_all's check-then-create is not atomic, so it is serialized:
+    # PostgreSQL takes an advisory lock inside the transaction, SQLite has
+    # none and uses an exclusive lock file next to the database instead
+    if engine.dialect.name == "sqlite":
+        with open(f"{engine.url.database}.init.lock", "w") as lock_file:
+            await asyncio.to_thread(fcntl.flock, lock_file, fcntl.LOCK_EX)
+            await create_and_seed()
+    else:
+        await create_and_seed()
+    print("Ensured demo users exist: admin, teacher1, parent1, student1")
 
 @app.get("/")
 async def root():
@@ -65,5 +87,17 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+# Production: gunicorn -k uvicorn.workers.UvicornWorker -w $((2 * $(nproc) + 1)) --log-level warning main:app
+# Each worker is a separate process with its own in-process caches (see cache.py)
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8001, reload=False)
\ No newline at end of file
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8001,
+        reload=False,
+        loop="uvloop",
+        http="httptools",
+        workers=2 * (os.cpu_count() or 1) + 1,
+        access_log=False,
+        log_level="warning"
+    )
\ No newline at end of file
@@ -1,6 +1,7 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, ConfigDict, EmailStr
 from datetime import datetime
 from typing import Optional, List
+import msgspec
 
 # User models
 class UserBase(BaseModel):
@@ -16,8 +17,7 @@ class UserResponse(UserBase):
     id: int
     created_at: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 class UserLogin(BaseModel):
     username: str
@@ -38,13 +38,24 @@ class AssignmentBase(BaseModel):
 class AssignmentCreate(AssignmentBase):
     pass
 
+# Column fields only: validating from an ORM row reads every declared field,
+# so a relationship field here (created_by, submissions) would fire a lazy
+# load per row. Assignment relationships are lazy="raise" to catch that.
 class AssignmentResponse(AssignmentBase):
     id: int
     created_by_id: int
     created_at: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
+
+# Summary row for the assignment list endpoints; description and the audit
+# columns are only served by the detail endpoint
+class AssignmentListItem(BaseModel):
+    id: int
+    title: str
+    subject: str
+    class_name: str
+    due_date: datetime
 
 # Assignment Submission models
 class AssignmentSubmissionBase(BaseModel):
@@ -61,13 +72,19 @@ class AssignmentSubmissionResponse(AssignmentSubmissionBase):
     grade: Optional[str] = None
     feedback: Optional[str] = None
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 class AssignmentSubmissionGrade(BaseModel):
     grade: str
     feedback: Optional[str] = None
 
+class GradeItem(AssignmentSubmissionGrade):
+    id: int
+
+# Upper bound on items per batch request; keeps the multi-row INSERT and the
+# IN (...) list well inside SQLite's bound-parameter limit
+MAX_BATCH_SIZE = 100
+
 # Message models
 class MessageBase(BaseModel):
     subject: str
@@ -83,8 +100,7 @@ class MessageResponse(MessageBase):
     sent_at: datetime
     is_read: bool
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 # Registration Request models
 class RegistrationRequestBase(BaseModel):
@@ -102,8 +118,28 @@ class RegistrationRequestResponse(RegistrationRequestBase):
     requested_at: datetime
     processed_at: Optional[datetime] = None
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 class RegistrationRequestUpdate(BaseModel):
     status: str  # approved, rejected
+
+# msgspec mirrors of the response models, used by hot list endpoints to
+# encode rows without going through Pydantic validation
+class AssignmentOut(msgspec.Struct, kw_only=True):
+    title: str
+    description: Optional[str] = None
+    subject: str
+    class_name: str
+    due_date: datetime
+    id: int
+    created_by_id: int
+    created_at: datetime
+
+class MessageOut(msgspec.Struct):
+    subject: str
+    content: str
+    id: int
+    sender_id: int
+    receiver_id: int
+    sent_at: datetime
+    is_read: bool
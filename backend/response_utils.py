@@ -0,0 +1,62 @@
+from fastapi import HTTPException, Response, status
+from fastapi.responses import ORJSONResponse
+from typing import List
+from cache import response_cache
+import base64
+import msgspec
+import orjson
+
+# Aware UTC datetimes are encoded as "...Z", the form msgspec (struct lists)
+# and Pydantic (response_model routes) emit, so every endpoint agrees
+def json_dumps(content) -> bytes:
+    """orjson.dumps with the API's datetime format"""
+    return orjson.dumps(content, option=orjson.OPT_UTC_Z)
+
+class UTCJSONResponse(ORJSONResponse):
+    """ORJSONResponse using the API's datetime format"""
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z)
+
+def list_response(model, rows):
+    """Serialize ORM rows through a response model and hand them straight to orjson"""
+    return UTCJSONResponse([model.model_validate(row).model_dump() for row in rows])
+
+def model_response(model, obj):
+    """Build a response model from an ORM row without running its validators"""
+    # Returning a Response also skips FastAPI's response_model re-validation;
+    # response_model stays on the route for the OpenAPI docs
+    instance = model.model_construct(**{name: getattr(obj, name) for name in model.model_fields})
+    return UTCJSONResponse(instance.model_dump())
+
+def struct_list_response(struct_type, rows):
+    """Encode ORM rows through msgspec structs, skipping Pydantic entirely"""
+    items = msgspec.convert(rows, List[struct_type], from_attributes=True)
+    return Response(msgspec.json.encode(items), media_type="application/json")
+
+def cached_response(key):
+    """Replay a list response cached under key, or None on a miss"""
+    hit = response_cache.get(key)
+    if hit is None:
+        return None
+    body, headers = hit
+    return Response(body, media_type="application/json", headers=headers)
+
+def cache_list_response(key, model, rows, headers=None):
+    """Serialize rows through a response model once and cache the body under key"""
+    body = json_dumps([model.model_validate(row).model_dump() for row in rows])
+    response_cache[key] = (body, headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+def encode_cursor(row_id: int) -> str:
+    """Opaque keyset cursor for the id of the last row on a page"""
+    return base64.urlsafe_b64encode(str(row_id).encode()).decode()
+
+def decode_cursor(cursor: str) -> int:
+    """Inverse of encode_cursor; a malformed cursor is a 400"""
+    try:
+        return int(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
@@ -1,17 +1,21 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import lambda_stmt, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-from database import get_db
+from database import get_db, insert_ignore
 from schemas import Assignment, AssignmentSubmission, User
-from models import AssignmentCreate, AssignmentResponse, AssignmentSubmissionCreate, AssignmentSubmissionResponse
+from models import AssignmentCreate, AssignmentResponse, AssignmentOut, AssignmentSubmissionCreate, AssignmentSubmissionResponse
 from auth_utils import get_current_user
+from response_utils import model_response, struct_list_response
+from cache import get_assignment_cached, invalidate_assignment, invalidate_list_responses
 
 router = APIRouter(prefix="/assignments", tags=["assignments"])
 
 @router.post("/", response_model=AssignmentResponse)
-def create_assignment(
+async def create_assignment(
     assignment: AssignmentCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Create a new assignment (teachers only)"""
@@ -22,64 +26,67 @@ def create_assignment(
         )
     
     db_assignment = Assignment(
-        **assignment.dict(),
+        **assignment.model_dump(),
         created_by_id=current_user.id
     )
     db.add(db_assignment)
-    db.commit()
-    db.refresh(db_assignment)
-    return db_assignment
+    await db.commit()
+    invalidate_list_responses()
+    return model_response(AssignmentResponse, db_assignment)
 
-@router.get("/", response_model=List[AssignmentResponse])
-def get_assignments(
+@router.get("/")
+async def get_assignments(
     class_name: Optional[str] = None,
     subject: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get assignments based on user role and filters"""
-    query = db.query(Assignment)
+    # lambda_stmt caches the statement construction itself, keyed on the lambdas' code
+    stmt = lambda_stmt(lambda: select(Assignment))
     
     if current_user.role == "student":
         # Students see assignments for their class or all classes
         if class_name:
-            query = query.filter(
+            stmt += lambda s: s.where(
                 (Assignment.class_name == class_name) | 
                 (Assignment.class_name == "all")
             )
     elif current_user.role == "teacher":
         # Teachers see assignments they created
-        query = query.filter(Assignment.created_by_id == current_user.id)
+        user_id = current_user.id
+        stmt += lambda s: s.where(Assignment.created_by_id == user_id)
     
     if subject:
-        query = query.filter(Assignment.subject == subject)
+        stmt += lambda s: s.where(Assignment.subject == subject)
     
-    return query.all()
+    assignments = (await db.execute(stmt)).scalars().all()
+    return struct_list_response(AssignmentOut, assignments)
 
 @router.get("/{assignment_id}", response_model=AssignmentResponse)
-def get_assignment(
+async def get_assignment(
     assignment_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get a specific assignment"""
-    assignment = db.query(Assignment).filter(Assignment.id == assignment_id).first()
-    if not assignment:
+    assignment = await get_assignment_cached(db, assignment_id)
+    if assignment is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Assignment not found"
         )
-    return assignment
+    return model_response(AssignmentResponse, assignment)
 
 @router.put("/{assignment_id}", response_model=AssignmentResponse)
-def update_assignment(
+async def update_assignment(
     assignment_id: int,
     assignment_update: AssignmentCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Update an assignment (creator only)"""
-    assignment = db.query(Assignment).filter(Assignment.id == assignment_id).first()
+    assignment = await db.get(Assignment, assignment_id)
     if not assignment:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -92,21 +99,22 @@ def update_assignment(
             detail="You can only update your own assignments"
         )
     
-    for field, value in assignment_update.dict().items():
+    for field, value in assignment_update.model_dump(exclude_unset=True).items():
         setattr(assignment, field, value)
     
-    db.commit()
-    db.refresh(assignment)
-    return assignment
+    await db.commit()
+    invalidate_assignment(assignment_id)
+    await db.refresh(assignment)
+    return model_response(AssignmentResponse, assignment)
 
 @router.delete("/{assignment_id}")
-def delete_assignment(
+async def delete_assignment(
     assignment_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Delete an assignment (creator only)"""
-    assignment = db.query(Assignment).filter(Assignment.id == assignment_id).first()
+    assignment = await db.get(Assignment, assignment_id)
     if not assignment:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -119,16 +127,24 @@ def delete_assignment(
             detail="You can only delete your own assignments"
         )
     
-    db.delete(assignment)
-    db.commit()
+    try:
+        await db.delete(assignment)
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Assignments with submissions cannot be deleted"
+        )
+    invalidate_assignment(assignment_id)
     return {"message": "Assignment deleted successfully"}
 
 # Assignment Submissions
 @router.post("/{assignment_id}/submissions", response_model=AssignmentSubmissionResponse)
-def submit_assignment(
+async def submit_assignment(
     assignment_id: int,
     submission: AssignmentSubmissionCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Submit an assignment (students only)"""
@@ -138,41 +154,37 @@ def submit_assignment(
             detail="Only students can submit assignments"
         )
     
-    # Check if assignment exists
-    assignment = db.query(Assignment).filter(Assignment.id == assignment_id).first()
-    if not assignment:
+    # One INSERT: the unique constraint turns a resubmission into no row,
+    # and the assignment foreign key rejects unknown assignments
+    stmt = insert_ignore(AssignmentSubmission).values(
+        assignment_id=assignment_id,
+        student_id=current_user.id,
+        submission_text=submission.submission_text,
+        file_path=submission.file_path
+    ).returning(AssignmentSubmission)
+    try:
+        db_submission = (await db.execute(stmt)).scalar_one_or_none()
+    except IntegrityError:
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Assignment not found"
         )
     
-    # Check if student already submitted
-    existing_submission = db.query(AssignmentSubmission).filter(
-        AssignmentSubmission.assignment_id == assignment_id,
-        AssignmentSubmission.student_id == current_user.id
-    ).first()
-    
-    if existing_submission:
+    if db_submission is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Assignment already submitted"
         )
     
-    db_submission = AssignmentSubmission(
-        assignment_id=assignment_id,
-        student_id=current_user.id,
-        submission_text=submission.submission_text,
-        file_path=submission.file_path
-    )
-    db.add(db_submission)
-    db.commit()
-    db.refresh(db_submission)
-    return db_submission
+    await db.commit()
+    invalidate_list_responses()
+    return model_response(AssignmentSubmissionResponse, db_submission)
 
 @router.get("/{assignment_id}/submissions", response_model=List[AssignmentSubmissionResponse])
-def get_assignment_submissions(
+async def get_assignment_submissions(
     assignment_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get submissions for an assignment (teachers and admins only)"""
@@ -182,6 +194,8 @@ def get_assignment_submissions(
             detail="Only teachers and admins can view submissions"
         )
     
-    return db.query(AssignmentSubmission).filter(
-        AssignmentSubmission.assignment_id == assignment_id
-    ).all()
+    return (await db.execute(
+        select(AssignmentSubmission).where(
+            AssignmentSubmission.assignment_id == assignment_id
+        )
+    )).scalars().all()
@@ -1,6 +1,5 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
 from database import get_db
 from schemas import User
 from auth_utils import get_current_user
@@ -8,16 +7,16 @@ from auth_utils import get_current_user
 router = APIRouter()
 
 @router.get("/")
-def get_attendance(
-    db: Session = Depends(get_db),
+async def get_attendance(
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get attendance records"""
     return {"message": "Attendance feature coming soon"}
 
 @router.post("/")
-def mark_attendance(
-    db: Session = Depends(get_db),
+async def mark_attendance(
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Mark attendance"""
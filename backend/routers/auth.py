@@ -1,22 +1,31 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from database import get_db
+from sqlalchemy import func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_db, SessionLocal
 from schemas import User, RegistrationRequest
 from models import UserLogin, Token, UserResponse, RegistrationRequestCreate, RegistrationRequestResponse, RegistrationRequestUpdate
 from auth_utils import verify_password, create_access_token, get_password_hash, get_current_user
-from typing import List
-from datetime import datetime
+from response_utils import json_dumps, list_response, model_response
+from cache import invalidate_users
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 security = HTTPBearer()
 
 @router.post("/login", response_model=Token)
-def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
+async def login(user_credentials: UserLogin, db: AsyncSession = Depends(get_db)):
     """Authenticate user and return access token"""
-    user = db.query(User).filter(User.username == user_credentials.username).first()
+    user = (await db.execute(
+        select(User).where(User.username == user_credentials.username)
+    )).scalar_one_or_none()
     
-    if not user or not verify_password(user_credentials.password, user.password_hash):
+    # Password hashing is CPU-bound; keep it off the event loop
+    if not user or not await run_in_threadpool(verify_password, user_credentials.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials"
@@ -26,12 +35,12 @@ def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.get("/me", response_model=UserResponse)
-def get_current_user_info(current_user: User = Depends(get_current_user)):
+async def get_current_user_info(current_user: User = Depends(get_current_user)):
     """Get current user information"""
-    return current_user
+    return model_response(UserResponse, current_user)
 
-@router.get("/users", response_model=List[UserResponse])
-def get_all_users(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+@router.get("/users")
+async def get_all_users(current_user: User = Depends(get_current_user)):
     """Get all users (admin only)"""
     if current_user.role != "admin":
         raise HTTPException(
@@ -39,16 +48,48 @@ def get_all_users(db: Session = Depends(get_db), current_user: User = Depends(ge
             detail="Only admins can view all users"
         )
     
-    users = db.query(User).all()
-    return users
+    async def stream_users():
+        # Own session: the body is produced after the handler (and its
+        # dependencies) have returned
+        async with SessionLocal() as db:
+            result = await db.stream(
+                select(User.username, User.email, User.name, User.role, User.id, User.created_at)
+                .execution_options(yield_per=1000)
+            )
+            yield b"["
+            first = True
+            try:
+                # One chunk per yield_per partition rather than one send per row
+                async for partition in result.mappings().partitions():
+                    # Encode the partition as an array and drop its brackets
+                    body = json_dumps([dict(row) for row in partition])[1:-1]
+                    yield body if first else b"," + body
+                    first = False
+            except Exception:
+                # The 200 status is already sent; re-raising makes the server
+                # abort the connection, so the client sees a broken transfer
+                # rather than a cleanly terminated, truncated array
+                logger.exception("Streaming the user list failed")
+                raise
+            yield b"]"
+    
+    return StreamingResponse(stream_users(), media_type="application/json")
 
 @router.post("/register-request", response_model=RegistrationRequestResponse)
-def create_registration_request(request: RegistrationRequestCreate, db: Session = Depends(get_db)):
+async def create_registration_request(request: RegistrationRequestCreate, db: AsyncSession = Depends(get_db)):
     """Create a new registration request"""
-    # Check if username or email already exists
-    existing_user = db.query(User).filter(
-        (User.username == request.username) | (User.email == request.email)
-    ).first()
+    # Check for an existing user and a pending request in one round-trip
+    user_exists = select(User.id).where(
+        or_(User.username == request.username, User.email == request.email)
+    ).exists()
+    request_exists = select(RegistrationRequest.id).where(
+        RegistrationRequest.status == "pending",
+        or_(
+            RegistrationRequest.username == request.username,
+            RegistrationRequest.email == request.email
+        )
+    ).exists()
+    existing_user, existing_request = (await db.execute(select(user_exists, request_exists))).one()
     
     if existing_user:
         raise HTTPException(
@@ -56,26 +97,19 @@ def create_registration_request(request: RegistrationRequestCreate, db: Session
             detail="Username or email already exists"
         )
     
-    # Check if there's already a pending request
-    existing_request = db.query(RegistrationRequest).filter(
-        (RegistrationRequest.username == request.username) | 
-        (RegistrationRequest.email == request.email)
-    ).filter(RegistrationRequest.status == "pending").first()
-    
     if existing_request:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Registration request already pending"
         )
     
-    db_request = RegistrationRequest(**request.dict())
+    db_request = RegistrationRequest(**request.model_dump())
     db.add(db_request)
-    db.commit()
-    db.refresh(db_request)
-    return db_request
+    await db.commit()
+    return model_response(RegistrationRequestResponse, db_request)
 
-@router.get("/register-requests", response_model=List[RegistrationRequestResponse])
-def get_registration_requests(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+@router.get("/register-requests")
+async def get_registration_requests(db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)):
     """Get all registration requests (admin only)"""
     if current_user.role != "admin":
         raise HTTPException(
@@ -83,14 +117,14 @@ def get_registration_requests(db: Session = Depends(get_db), current_user: User
             detail="Only admins can view registration requests"
         )
     
-    requests = db.query(RegistrationRequest).all()
-    return requests
+    requests = (await db.execute(select(RegistrationRequest))).scalars().all()
+    return list_response(RegistrationRequestResponse, requests)
 
 @router.put("/register-requests/{request_id}", response_model=RegistrationRequestResponse)
-def process_registration_request(
+async def process_registration_request(
     request_id: int,
     request_update: RegistrationRequestUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Process a registration request (admin only)"""
@@ -100,7 +134,9 @@ def process_registration_request(
             detail="Only admins can process registration requests"
         )
     
-    db_request = db.query(RegistrationRequest).filter(RegistrationRequest.id == request_id).first()
+    db_request = (await db.execute(
+        select(RegistrationRequest).where(RegistrationRequest.id == request_id)
+    )).scalar_one_or_none()
     if not db_request:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -114,7 +150,7 @@ def process_registration_request(
         )
     
     db_request.status = request_update.status
-    db_request.processed_at = datetime.utcnow()
+    db_request.processed_at = func.now()
     
     # If approved, create the user account
     if request_update.status == "approved":
@@ -126,10 +162,12 @@ def process_registration_request(
             email=db_request.email,
             name=db_request.name,
             role=db_request.role,
-            password_hash=get_password_hash(default_password)
+            password_hash=await run_in_threadpool(get_password_hash, default_password)
         )
         db.add(new_user)
     
-    db.commit()
-    db.refresh(db_request)
-    return db_request
+    await db.commit()
+    if request_update.status == "approved":
+        invalidate_users()
+    await db.refresh(db_request)
+    return model_response(RegistrationRequestResponse, db_request)
@@ -1,22 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy import func, lambda_stmt, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
 from database import get_db
 from schemas import Message, User
-from models import MessageCreate, MessageResponse
+from models import MessageCreate, MessageResponse, MessageOut
 from auth_utils import get_current_user
+from response_utils import model_response, struct_list_response
+from cache import teachers_cache
+import orjson
 
 router = APIRouter(prefix="/messages", tags=["messages"])
 
+# Built once at import so every call reuses the same cached compiled statement
+FIRST_TEACHER = select(User).where(User.role == "teacher").limit(1)
+
 @router.post("/", response_model=MessageResponse)
-def send_message(
+async def send_message(
     message: MessageCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Send a message to another user"""
     # Check if recipient exists
-    recipient = db.query(User).filter(User.id == message.to_user_id).first()
+    recipient = await db.get(User, message.to_user_id)
     if not recipient:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -24,50 +31,57 @@ def send_message(
         )
     
     db_message = Message(
-        **message.dict(),
+        **message.model_dump(),
         from_user_id=current_user.id
     )
     db.add(db_message)
-    db.commit()
-    db.refresh(db_message)
-    return db_message
+    await db.commit()
+    return model_response(MessageResponse, db_message)
 
-@router.get("/", response_model=List[MessageResponse])
-def get_messages(
+@router.get("/")
+async def get_messages(
     message_type: Optional[str] = None,
     unread_only: bool = False,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get messages for current user"""
-    query = db.query(Message).filter(Message.to_user_id == current_user.id)
+    user_id = current_user.id
+    stmt = lambda_stmt(lambda: select(Message).where(
+        Message.to_user_id == user_id
+    ).order_by(Message.created_at.desc()))
     
     if message_type:
-        query = query.filter(Message.message_type == message_type)
+        stmt += lambda s: s.where(Message.message_type == message_type)
     
     if unread_only:
-        query = query.filter(Message.read == False)
+        stmt += lambda s: s.where(Message.read == False)
     
-    return query.order_by(Message.created_at.desc()).all()
+    messages = (await db.execute(stmt)).scalars().all()
+    return struct_list_response(MessageOut, messages)
 
-@router.get("/sent", response_model=List[MessageResponse])
-def get_sent_messages(
-    db: Session = Depends(get_db),
+@router.get("/sent")
+async def get_sent_messages(
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get messages sent by current user"""
-    return db.query(Message).filter(
-        Message.from_user_id == current_user.id
-    ).order_by(Message.created_at.desc()).all()
+    user_id = current_user.id
+    messages = (await db.execute(lambda_stmt(
+        lambda: select(Message).where(
+            Message.from_user_id == user_id
+        ).order_by(Message.created_at.desc())
+    ))).scalars().all()
+    return struct_list_response(MessageOut, messages)
 
 @router.get("/{message_id}", response_model=MessageResponse)
-def get_message(
+async def get_message(
     message_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get a specific message"""
-    message = db.query(Message).filter(Message.id == message_id).first()
+    message = await db.get(Message, message_id)
     if not message:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -81,16 +95,16 @@ def get_message(
             detail="You don't have access to this message"
         )
     
-    return message
+    return model_response(MessageResponse, message)
 
 @router.put("/{message_id}/read")
-def mark_message_as_read(
+async def mark_message_as_read(
     message_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Mark a message as read"""
-    message = db.query(Message).filter(Message.id == message_id).first()
+    message = await db.get(Message, message_id)
     if not message:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -105,24 +119,26 @@ def mark_message_as_read(
         )
     
     message.read = True
-    db.commit()
+    await db.commit()
     return {"message": "Message marked as read"}
 
 @router.get("/unread/count")
-def get_unread_count(
-    db: Session = Depends(get_db),
+async def get_unread_count(
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get count of unread messages"""
-    count = db.query(Message).filter(
-        Message.to_user_id == current_user.id,
-        Message.read == False
-    ).count()
+    count = (await db.execute(
+        select(func.count(Message.id)).where(
+            Message.to_user_id == current_user.id,
+            Message.read == False
+        )
+    )).scalar_one()
     return {"unread_count": count}
 
 @router.get("/teachers")
-def get_teachers(
-    db: Session = Depends(get_db),
+async def get_teachers(
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get list of teachers for messaging"""
@@ -132,13 +148,20 @@ def get_teachers(
             detail="Access denied"
         )
     
-    teachers = db.query(User).filter(User.role == "teacher").all()
-    return [{"id": t.id, "name": t.name, "username": t.username} for t in teachers]
+    payload = teachers_cache.get("teachers")
+    if payload is None:
+        # Plain column rows: no ORM instances to build for a three-field payload
+        rows = (await db.execute(
+            select(User.id, User.name, User.username).where(User.role == "teacher")
+        )).all()
+        payload = orjson.dumps([{"id": teacher_id, "name": name, "username": username} for teacher_id, name, username in rows])
+        teachers_cache["teachers"] = payload
+    return Response(payload, media_type="application/json")
 
 @router.post("/send-to-teacher")
-def send_message_to_teacher(
+async def send_message_to_teacher(
     message: MessageCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Send message to any teacher (for students and parents)"""
@@ -150,13 +173,15 @@ def send_message_to_teacher(
     
     # Find a teacher to send to (or use the specified to_user_id)
     if message.to_user_id:
-        teacher = db.query(User).filter(
-            User.id == message.to_user_id,
-            User.role == "teacher"
-        ).first()
+        teacher = (await db.execute(
+            select(User).where(
+                User.id == message.to_user_id,
+                User.role == "teacher"
+            )
+        )).scalar_one_or_none()
     else:
         # Send to first available teacher
-        teacher = db.query(User).filter(User.role == "teacher").first()
+        teacher = (await db.execute(FIRST_TEACHER)).scalar()
     
     if not teacher:
         raise HTTPException(
@@ -172,6 +197,5 @@ def send_message_to_teacher(
         to_user_id=teacher.id
     )
     db.add(db_message)
-    db.commit()
-    db.refresh(db_message)
+    await db.commit()
     return db_message
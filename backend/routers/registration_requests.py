@@ -1,23 +1,29 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func, lambda_stmt, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from database import get_db
 from schemas import RegistrationRequest, User
 from models import RegistrationRequestCreate, RegistrationRequestResponse
-from auth_utils import get_current_user
+from auth_utils import get_current_user, get_password_hash
+from response_utils import list_response, model_response
+from cache import invalidate_users
 
 router = APIRouter(prefix="/registration-requests", tags=["registration-requests"])
 
 @router.post("/", response_model=RegistrationRequestResponse)
-def create_registration_request(
+async def create_registration_request(
     request: RegistrationRequestCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Create a new registration request (public endpoint)"""
     # Check if email already exists
-    existing_request = db.query(RegistrationRequest).filter(
-        RegistrationRequest.email == request.email
-    ).first()
+    existing_request = (await db.execute(
+        select(select(RegistrationRequest.id).where(
+            RegistrationRequest.email == request.email
+        ).exists())
+    )).scalar()
     
     if existing_request:
         raise HTTPException(
@@ -25,16 +31,15 @@ def create_registration_request(
             detail="Registration request with this email already exists"
         )
     
-    db_request = RegistrationRequest(**request.dict())
+    db_request = RegistrationRequest(**request.model_dump())
     db.add(db_request)
-    db.commit()
-    db.refresh(db_request)
-    return db_request
+    await db.commit()
+    return model_response(RegistrationRequestResponse, db_request)
 
-@router.get("/", response_model=List[RegistrationRequestResponse])
-def get_registration_requests(
+@router.get("/")
+async def get_registration_requests(
     status_filter: str = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get all registration requests (admin only)"""
@@ -44,16 +49,17 @@ def get_registration_requests(
             detail="Only admins can view registration requests"
         )
     
-    query = db.query(RegistrationRequest)
+    stmt = lambda_stmt(lambda: select(RegistrationRequest).order_by(RegistrationRequest.created_at.desc()))
     if status_filter:
-        query = query.filter(RegistrationRequest.status == status_filter)
+        stmt += lambda s: s.where(RegistrationRequest.status == status_filter)
     
-    return query.order_by(RegistrationRequest.created_at.desc()).all()
+    requests = (await db.execute(stmt)).scalars().all()
+    return list_response(RegistrationRequestResponse, requests)
 
 @router.get("/{request_id}", response_model=RegistrationRequestResponse)
-def get_registration_request(
+async def get_registration_request(
     request_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get a specific registration request (admin only)"""
@@ -63,9 +69,7 @@ def get_registration_request(
             detail="Only admins can view registration requests"
         )
     
-    request = db.query(RegistrationRequest).filter(
-        RegistrationRequest.id == request_id
-    ).first()
+    request = await db.get(RegistrationRequest, request_id)
     
     if not request:
         raise HTTPException(
@@ -73,12 +77,12 @@ def get_registration_request(
             detail="Registration request not found"
         )
     
-    return request
+    return model_response(RegistrationRequestResponse, request)
 
 @router.put("/{request_id}/approve")
-def approve_registration_request(
+async def approve_registration_request(
     request_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Approve a registration request and create user account (admin only)"""
@@ -88,9 +92,7 @@ def approve_registration_request(
             detail="Only admins can approve registration requests"
         )
     
-    request = db.query(RegistrationRequest).filter(
-        RegistrationRequest.id == request_id
-    ).first()
+    request = await db.get(RegistrationRequest, request_id)
     
     if not request:
         raise HTTPException(
@@ -104,16 +106,17 @@ def approve_registration_request(
             detail="Request has already been processed"
         )
     
-    # Create user account
-    from auth_utils import get_password_hash
-    
-    # Generate username from email
+    # Create user account, generating the username from the email
     username = request.email.split('@')[0]
     counter = 1
     original_username = username
     
-    # Ensure unique username
-    while db.query(User).filter(User.username == username).first():
+    # Ensure unique username: fetch every taken name sharing the prefix in one
+    # query, then pick the first free suffix in memory
+    taken = set((await db.execute(
+        select(User.username).where(User.username.startswith(original_username, autoescape=True))
+    )).scalars())
+    while username in taken:
         username = f"{original_username}{counter}"
         counter += 1
     
@@ -123,14 +126,24 @@ def approve_registration_request(
     new_user = User(
         username=username,
         email=request.email,
-        password_hash=get_password_hash(default_password),
+        password_hash=await run_in_threadpool(get_password_hash, default_password),
         name=f"{request.first_name} {request.last_name}",
         role="student"  # Default role for registration requests
     )
     
     db.add(new_user)
     request.status = "approved"
-    db.commit()
+    request.processed_at = func.now()
+    try:
+        await db.commit()
+    except IntegrityError:
+        # users.username/email are unique, so a concurrent approval loses here
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A user with this username or email already exists"
+        )
+    invalidate_users()
     
     return {
         "message": "Registration request approved and user account created",
@@ -139,9 +152,9 @@ def approve_registration_request(
     }
 
 @router.put("/{request_id}/reject")
-def reject_registration_request(
+async def reject_registration_request(
     request_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Reject a registration request (admin only)"""
@@ -151,9 +164,7 @@ def reject_registration_request(
             detail="Only admins can reject registration requests"
         )
     
-    request = db.query(RegistrationRequest).filter(
-        RegistrationRequest.id == request_id
-    ).first()
+    request = await db.get(RegistrationRequest, request_id)
     
     if not request:
         raise HTTPException(
@@ -168,14 +179,15 @@ def reject_registration_request(
         )
     
     request.status = "rejected"
-    db.commit()
+    request.processed_at = func.now()
+    await db.commit()
     
     return {"message": "Registration request rejected"}
 
 @router.delete("/{request_id}")
-def delete_registration_request(
+async def delete_registration_request(
     request_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Delete a registration request (admin only)"""
@@ -185,9 +197,7 @@ def delete_registration_request(
             detail="Only admins can delete registration requests"
         )
     
-    request = db.query(RegistrationRequest).filter(
-        RegistrationRequest.id == request_id
-    ).first()
+    request = await db.get(RegistrationRequest, request_id)
     
     if not request:
         raise HTTPException(
@@ -195,7 +205,7 @@ def delete_registration_request(
             detail="Registration request not found"
         )
     
-    db.delete(request)
-    db.commit()
+    await db.delete(request)
+    await db.commit()
     
     return {"message": "Registration request deleted successfully"}
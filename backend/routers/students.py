@@ -1,85 +1,142 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
-from database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import raiseload
+from typing import List, Optional
+from database import get_db, insert_ignore
 from schemas import User, Assignment, AssignmentSubmission
-from models import AssignmentResponse, AssignmentSubmissionCreate, AssignmentSubmissionResponse
-from auth_utils import get_current_user
+from models import MAX_BATCH_SIZE, AssignmentListItem, AssignmentSubmissionCreate, AssignmentSubmissionResponse
+from auth_utils import require_role
+from response_utils import cache_list_response, cached_response, decode_cursor, encode_cursor, list_response, model_response
+from cache import invalidate_list_responses
 
 router = APIRouter()
 
-@router.get("/assignments", response_model=List[AssignmentResponse])
-def get_student_assignments(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+@router.get("/assignments", response_model=List[AssignmentListItem])
+async def get_student_assignments(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_role("student"))
 ):
     """Get assignments for the current student"""
-    if current_user.role != "student":
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only students can access this endpoint"
-        )
+    # Every student sees the same list, so the cache entry is shared
+    cache_key = ("students/assignments", skip, limit)
+    cached = cached_response(cache_key)
+    if cached is not None:
+        return cached
     
-    assignments = db.query(Assignment).all()
-    return assignments
+    assignments = (await db.execute(
+        select(
+            Assignment.id,
+            Assignment.title,
+            Assignment.subject,
+            Assignment.class_name,
+            Assignment.due_date
+        ).order_by(Assignment.id).offset(skip).limit(limit)
+    )).mappings().all()
+    return cache_list_response(cache_key, AssignmentListItem, assignments)
 
 @router.post("/assignments/{assignment_id}/submit", response_model=AssignmentSubmissionResponse)
-def submit_assignment(
+async def submit_assignment(
     assignment_id: int,
     submission: AssignmentSubmissionCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_role("student", detail="Only students can submit assignments"))
 ):
     """Submit an assignment"""
-    if current_user.role != "student":
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only students can submit assignments"
-        )
-    
-    # Check if assignment exists
-    assignment = db.query(Assignment).filter(Assignment.id == assignment_id).first()
-    if not assignment:
+    # One INSERT: uq_submission_student turns a resubmission into no row,
+    # and the assignment foreign key rejects unknown assignments
+    stmt = insert_ignore(AssignmentSubmission).values(
+        assignment_id=assignment_id,
+        student_id=current_user.id,
+        content=submission.content
+    ).returning(AssignmentSubmission)
+    try:
+        db_submission = (await db.execute(stmt)).scalar_one_or_none()
+    except IntegrityError:
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Assignment not found"
         )
     
-    # Check if student has already submitted
-    existing_submission = db.query(AssignmentSubmission).filter(
-        AssignmentSubmission.assignment_id == assignment_id,
-        AssignmentSubmission.student_id == current_user.id
-    ).first()
-    
-    if existing_submission:
+    if db_submission is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Assignment already submitted"
         )
     
-    db_submission = AssignmentSubmission(
-        assignment_id=assignment_id,
-        student_id=current_user.id,
-        content=submission.content
-    )
-    db.add(db_submission)
-    db.commit()
-    db.refresh(db_submission)
-    return db_submission
+    await db.commit()
+    invalidate_list_responses()
+    return model_response(AssignmentSubmissionResponse, db_submission)
 
 @router.get("/submissions", response_model=List[AssignmentSubmissionResponse])
-def get_student_submissions(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+async def get_student_submissions(
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_role("student"))
 ):
-    """Get all submissions for the current student"""
-    if current_user.role != "student":
+    """Get the current student's submissions, newest first"""
+    cache_key = ("students/submissions", current_user.id, cursor, limit)
+    cached = cached_response(cache_key)
+    if cached is not None:
+        return cached
+    
+    # Keyset pagination: resume below the previous page's last id, so deep
+    # pages cost the same as the first. submitted_at is stamped by the
+    # server at insert, so id order is submission order.
+    stmt = select(AssignmentSubmission).options(raiseload("*")).where(
+        AssignmentSubmission.student_id == current_user.id
+    )
+    if cursor:
+        stmt = stmt.where(AssignmentSubmission.id < decode_cursor(cursor))
+    submissions = (await db.execute(
+        stmt.order_by(AssignmentSubmission.id.desc()).limit(limit)
+    )).scalars().all()
+    
+    headers = None
+    if len(submissions) == limit:
+        headers = {"X-Next-Cursor": encode_cursor(submissions[-1].id)}
+    return cache_list_response(cache_key, AssignmentSubmissionResponse, submissions, headers)
+
+@router.post("/submissions/batch", response_model=List[AssignmentSubmissionResponse])
+async def submit_assignments_batch(
+    submissions: List[AssignmentSubmissionCreate],
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_role("student", detail="Only students can submit assignments"))
+):
+    """Submit several assignments in one request; already-submitted ones are skipped"""
+    if len(submissions) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_BATCH_SIZE} items per batch"
+        )
+    
+    if not submissions:
+        return []
+    
+    # One multi-row INSERT and one commit for the whole batch. Only newly
+    # created submissions come back; an unknown assignment fails the batch.
+    stmt = insert_ignore(AssignmentSubmission).values([
+        {
+            "assignment_id": submission.assignment_id,
+            "student_id": current_user.id,
+            "content": submission.content
+        }
+        for submission in submissions
+    ]).returning(AssignmentSubmission)
+    try:
+        created = (await db.execute(stmt)).scalars().all()
+    except IntegrityError:
+        await db.rollback()
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only students can access this endpoint"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Assignment not found"
         )
     
-    submissions = db.query(AssignmentSubmission).filter(
-        AssignmentSubmission.student_id == current_user.id
-    ).all()
-    return submissions
+    await db.commit()
+    invalidate_list_responses()
+    return list_response(AssignmentSubmissionResponse, created)
@@ -1,123 +1,186 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, raiseload
 from typing import List
 from database import get_db
 from schemas import User, Assignment, AssignmentSubmission
-from models import AssignmentCreate, AssignmentResponse, AssignmentSubmissionResponse, AssignmentSubmissionGrade
-from auth_utils import get_current_user
+from models import MAX_BATCH_SIZE, AssignmentCreate, AssignmentListItem, AssignmentResponse, AssignmentSubmissionResponse, AssignmentSubmissionGrade, GradeItem
+from auth_utils import require_role
+from response_utils import cache_list_response, cached_response, model_response
+from cache import invalidate_list_responses
 
 router = APIRouter()
 
 @router.post("/assignments", response_model=AssignmentResponse)
-def create_assignment(
+async def create_assignment(
     assignment: AssignmentCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_role("teacher", "admin", detail="Only teachers and admins can create assignments"))
 ):
     """Create a new assignment (teachers only)"""
-    if current_user.role not in ["teacher", "admin"]:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only teachers and admins can create assignments"
-        )
-    
     db_assignment = Assignment(
-        **assignment.dict(),
+        **assignment.model_dump(),
         created_by_id=current_user.id
     )
     db.add(db_assignment)
-    db.commit()
-    db.refresh(db_assignment)
-    return db_assignment
+    await db.commit()
+    invalidate_list_responses()
+    return model_response(AssignmentResponse, db_assignment)
 
-@router.get("/assignments", response_model=List[AssignmentResponse])
-def get_teacher_assignments(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+@router.get("/assignments", response_model=List[AssignmentListItem])
+async def get_teacher_assignments(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_role("teacher", "admin"))
 ):
     """Get assignments created by the current teacher"""
-    if current_user.role not in ["teacher", "admin"]:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only teachers and admins can access this endpoint"
-        )
+    # Admins all see the same list; teachers see their own
+    owner_id = None if current_user.role == "admin" else current_user.id
+    cache_key = ("teachers/assignments", owner_id, skip, limit)
+    cached = cached_response(cache_key)
+    if cached is not None:
+        return cached
     
-    if current_user.role == "admin":
-        assignments = db.query(Assignment).all()
-    else:
-        assignments = db.query(Assignment).filter(
-            Assignment.created_by_id == current_user.id
-        ).all()
-    
-    return assignments
+    stmt = select(
+        Assignment.id,
+        Assignment.title,
+        Assignment.subject,
+        Assignment.class_name,
+        Assignment.due_date
+    )
+    if owner_id is not None:
+        stmt = stmt.where(Assignment.created_by_id == owner_id)
+    assignments = (await db.execute(
+        stmt.order_by(Assignment.id).offset(skip).limit(limit)
+    )).mappings().all()
+    return cache_list_response(cache_key, AssignmentListItem, assignments)
 
 @router.get("/assignments/{assignment_id}/submissions", response_model=List[AssignmentSubmissionResponse])
-def get_assignment_submissions(
+async def get_assignment_submissions(
     assignment_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_role("teacher", "admin", detail="Only teachers and admins can view submissions"))
 ):
     """Get all submissions for a specific assignment"""
-    if current_user.role not in ["teacher", "admin"]:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only teachers and admins can view submissions"
-        )
-    
     # Check if assignment exists and belongs to teacher (unless admin)
-    assignment = db.query(Assignment).filter(Assignment.id == assignment_id).first()
-    if not assignment:
+    created_by_id = (await db.execute(
+        select(Assignment.created_by_id).where(Assignment.id == assignment_id)
+    )).scalar_one_or_none()
+    if created_by_id is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Assignment not found"
         )
     
-    if current_user.role == "teacher" and assignment.created_by_id != current_user.id:
+    if current_user.role == "teacher" and created_by_id != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You can only view submissions for your own assignments"
         )
     
-    submissions = db.query(AssignmentSubmission).filter(
-        AssignmentSubmission.assignment_id == assignment_id
-    ).all()
-    return submissions
+    cache_key = ("teachers/submissions", assignment_id, skip, limit)
+    cached = cached_response(cache_key)
+    if cached is not None:
+        return cached
+    
+    submissions = (await db.execute(
+        select(AssignmentSubmission).options(raiseload("*")).where(
+            AssignmentSubmission.assignment_id == assignment_id
+        ).order_by(AssignmentSubmission.id).offset(skip).limit(limit)
+    )).scalars().all()
+    return cache_list_response(cache_key, AssignmentSubmissionResponse, submissions)
 
 @router.put("/submissions/{submission_id}/grade", response_model=AssignmentSubmissionResponse)
-def grade_submission(
+async def grade_submission(
     submission_id: int,
     grade_data: AssignmentSubmissionGrade,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_role("teacher", "admin", detail="Only teachers and admins can grade submissions"))
 ):
     """Grade a student's submission"""
-    if current_user.role not in ["teacher", "admin"]:
+    # The owning assignment comes back in the same query for the ownership check
+    submission = (await db.execute(
+        select(AssignmentSubmission).options(
+            joinedload(AssignmentSubmission.assignment)
+        ).where(AssignmentSubmission.id == submission_id)
+    )).scalar_one_or_none()
+    
+    if not submission:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Submission not found"
+        )
+    
+    # Check if teacher owns the assignment (unless admin)
+    if current_user.role == "teacher" and submission.assignment.created_by_id != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only teachers and admins can grade submissions"
+            detail="You can only grade submissions for your own assignments"
         )
     
-    submission = db.query(AssignmentSubmission).filter(
-        AssignmentSubmission.id == submission_id
-    ).first()
+    # A targeted UPDATE ... RETURNING instead of dirtying the object, flushing
+    # and refreshing it
+    graded = (await db.execute(
+        update(AssignmentSubmission).where(
+            AssignmentSubmission.id == submission_id
+        ).values(
+            grade=grade_data.grade,
+            feedback=grade_data.feedback
+        ).returning(AssignmentSubmission)
+    )).scalar_one()
+    await db.commit()
+    invalidate_list_responses()
+    return model_response(AssignmentSubmissionResponse, graded)
+
+@router.put("/submissions/grade/batch")
+async def grade_submissions_batch(
+    items: List[GradeItem],
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_role("teacher", "admin", detail="Only teachers and admins can grade submissions"))
+):
+    """Grade several submissions in one transaction"""
+    if len(items) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_BATCH_SIZE} items per batch"
+        )
     
-    if not submission:
+    grades = {item.id: item for item in items}
+    if not grades:
+        return {"message": "0 submissions graded"}
+    
+    # Existence and ownership for the whole batch in one query
+    owners = dict((await db.execute(
+        select(AssignmentSubmission.id, Assignment.created_by_id)
+        .join(AssignmentSubmission.assignment)
+        .where(AssignmentSubmission.id.in_(grades))
+    )).all())
+    
+    missing = sorted(set(grades) - set(owners))
+    if missing:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="Submission not found"
+            detail=f"Submissions not found: {missing}"
         )
     
-    # Check if teacher owns the assignment (unless admin)
-    if current_user.role == "teacher":
-        assignment = db.query(Assignment).filter(Assignment.id == submission.assignment_id).first()
-        if assignment.created_by_id != current_user.id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="You can only grade submissions for your own assignments"
-            )
+    if current_user.role == "teacher" and any(owner != current_user.id for owner in owners.values()):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You can only grade submissions for your own assignments"
+        )
     
-    submission.grade = grade_data.grade
-    submission.feedback = grade_data.feedback
-    db.commit()
-    db.refresh(submission)
-    return submission
+    # ORM bulk UPDATE by primary key: one executemany, one commit
+    await db.execute(
+        update(AssignmentSubmission),
+        [
+            {"id": item.id, "grade": item.grade, "feedback": item.feedback}
+            for item in grades.values()
+        ]
+    )
+    await db.commit()
+    invalidate_list_responses()
+    return {"message": f"{len(grades)} submissions graded"}
@@ -1,7 +1,7 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
 from database import Base
-from datetime import datetime
 
 class User(Base):
     __tablename__ = "users"
@@ -11,14 +11,16 @@ class User(Base):
     email = Column(String(100), unique=True, index=True, nullable=False)
     password_hash = Column(String(255), nullable=False)
     name = Column(String(100), nullable=False)
-    role = Column(String(20), nullable=False)  # admin, teacher, student, parent
-    created_at = Column(DateTime, default=datetime.utcnow)
+    role = Column(String(20), nullable=False, index=True)  # admin, teacher, student, parent
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
     
-    # Relationships
-    created_assignments = relationship("Assignment", back_populates="created_by")
-    assignment_submissions = relationship("AssignmentSubmission", back_populates="student")
-    sent_messages = relationship("Message", foreign_keys="Message.sender_id", back_populates="sender")
-    received_messages = relationship("Message", foreign_keys="Message.receiver_id", back_populates="receiver")
+    __mapper_args__ = {"eager_defaults": True}
+    
+    # Relationships (lazy="raise": list queries must eager-load what they use)
+    created_assignments = relationship("Assignment", back_populates="created_by", lazy="raise")
+    assignment_submissions = relationship("AssignmentSubmission", back_populates="student", lazy="raise")
+    sent_messages = relationship("Message", foreign_keys="Message.sender_id", back_populates="sender", lazy="raise")
+    received_messages = relationship("Message", foreign_keys="Message.receiver_id", back_populates="receiver", lazy="raise")
 
 class Assignment(Base):
     __tablename__ = "assignments"
@@ -29,42 +31,61 @@ class Assignment(Base):
     subject = Column(String(100), nullable=False)
     class_name = Column(String(50), nullable=False)
     due_date = Column(DateTime, nullable=False)
-    created_by_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_by_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        Index("ix_assign_class_subject", "class_name", "subject"),
+    )
+    # Fetch server-generated columns in the INSERT (RETURNING) so callers needn't refresh()
+    __mapper_args__ = {"eager_defaults": True}
     
     # Relationships
-    created_by = relationship("User", back_populates="created_assignments")
-    submissions = relationship("AssignmentSubmission", back_populates="assignment")
+    created_by = relationship("User", back_populates="created_assignments", lazy="raise")
+    # ON DELETE RESTRICT owns this: the ORM must not try to null out submissions
+    submissions = relationship("AssignmentSubmission", back_populates="assignment", lazy="raise", passive_deletes="all")
 
 class AssignmentSubmission(Base):
     __tablename__ = "assignment_submissions"
     
     id = Column(Integer, primary_key=True, index=True)
-    assignment_id = Column(Integer, ForeignKey("assignments.id"), nullable=False)
-    student_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    assignment_id = Column(Integer, ForeignKey("assignments.id", ondelete="RESTRICT"), nullable=False)  # indexed via uq_submission_student
+    student_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     content = Column(Text, nullable=False)
-    submitted_at = Column(DateTime, default=datetime.utcnow)
+    submitted_at = Column(DateTime(timezone=True), server_default=func.now())
     grade = Column(String(10))
     feedback = Column(Text)
     
     # Relationships
-    assignment = relationship("Assignment", back_populates="submissions")
-    student = relationship("User", back_populates="assignment_submissions")
+    assignment = relationship("Assignment", back_populates="submissions", lazy="raise")
+    student = relationship("User", back_populates="assignment_submissions", lazy="raise")
+    
+    __table_args__ = (
+        # Also serves as the (assignment_id, student_id) lookup index
+        UniqueConstraint("assignment_id", "student_id", name="uq_submission_student"),
+    )
+    __mapper_args__ = {"eager_defaults": True}
 
 class Message(Base):
     __tablename__ = "messages"
     
     id = Column(Integer, primary_key=True, index=True)
-    sender_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    receiver_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    sender_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    receiver_id = Column(Integer, ForeignKey("users.id"), nullable=False)  # indexed via ix_msg_to_read
     subject = Column(String(200), nullable=False)
     content = Column(Text, nullable=False)
-    sent_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime(timezone=True), server_default=func.now())
     is_read = Column(Boolean, default=False)
     
     # Relationships
-    sender = relationship("User", foreign_keys=[sender_id], back_populates="sent_messages")
-    receiver = relationship("User", foreign_keys=[receiver_id], back_populates="received_messages")
+    sender = relationship("User", foreign_keys=[sender_id], back_populates="sent_messages", lazy="raise")
+    receiver = relationship("User", foreign_keys=[receiver_id], back_populates="received_messages", lazy="raise")
+    
+    __table_args__ = (
+        # One inbox, optionally narrowed to its unread rows (list and unread count)
+        Index("ix_msg_to_read", "receiver_id", "is_read"),
+    )
+    __mapper_args__ = {"eager_defaults": True}
 
 class RegistrationRequest(Base):
     __tablename__ = "registration_requests"
@@ -75,5 +96,15 @@ class RegistrationRequest(Base):
     name = Column(String(100), nullable=False)
     role = Column(String(20), nullable=False)
     status = Column(String(20), default="pending")  # pending, approved, rejected
-    requested_at = Column(DateTime, default=datetime.utcnow)
-    processed_at = Column(DateTime)
+    requested_at = Column(DateTime(timezone=True), server_default=func.now())
+    processed_at = Column(DateTime(timezone=True))
+    
+    __table_args__ = (
+        # Email probes: the email-only check in registration_requests and the
+        # email side of the pending check in auth.register-request
+        Index("ix_reg_email_status", "email", "status"),
+        # Username side of that pending check (status = 'pending' AND
+        # (username = ? OR email = ?)), so neither OR branch needs a scan
+        Index("ix_reg_username_status", "username", "status"),
+    )
+    __mapper_args__ = {"eager_defaults": True}